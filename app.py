@@ -1,4 +1,5 @@
 import streamlit as st
+from profiler import profile_run, profiling_enabled, show_profile_viewer
 from risk_calculator import show_risk_calculator
 from trade_plan_dtt import show_trade_plan
 
@@ -12,7 +13,11 @@ section = st.sidebar.radio(
     "Go to",
     ["Risk Calculator", "DTT Trade Plan"] 
  )
-if section == "Risk Calculator":
-    show_risk_calculator()
-else: 
-    show_trade_plan()
\ No newline at end of file
+if profiling_enabled():
+    show_profile_viewer()
+
+with profile_run(section):
+    if section == "Risk Calculator":
+        show_risk_calculator()
+    else: 
+        show_trade_plan()
\ No newline at end of file
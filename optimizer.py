@@ -0,0 +1,386 @@
+import argparse
+import csv
+import itertools
+import os
+from bisect import bisect_right
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from functools import lru_cache
+
+import pytz
+
+from risk_calculator import DAILY_CAP_PCT, DIVIDER_MAP, prop_firm_risk
+from trade_plan_dtt import (
+    ENTRY_WINDOW_HOURS, HIGH_DISCIPLINE_PCT, SCORE_WEIGHTS, TIMEZONE, get_4h_window
+)
+
+# Walk-forward search over the trade plan's magic numbers.
+#
+# Candles:  <data-dir>/<SYMBOL>.csv  — timestamp, open, high, low, close, volume
+# Journal:  timestamp, symbol, direction, daily_zones, target_ok, timing_ok, r_multiple
+#
+# Timestamps are ISO 8601 or epoch seconds / milliseconds. Naive candle
+# timestamps are read as UTC (exchange exports); naive journal timestamps are
+# read in --journal-tz, which defaults to the app's America/Bogota.
+#
+# Candidates are ranked by P&L per dollar of max drawdown, and any candidate
+# that breaches the simulated daily or max drawdown limit is rejected.
+#
+# The daily range location is cached per symbol (lru_cache) and each trade's
+# minutes to its 4H close are resolved once; workers receive the resolved
+# trades once, so candidates only re-run the scoring arithmetic.
+#
+# Journaled trades already passed Gate 1 and the 4H → 1H alignment, and neither
+# candles nor journal carry that structure, so both are treated as passed and
+# their weights are not searched.
+
+PARAM_GRID = {
+    "window_hours": [1, 1.5, ENTRY_WINDOW_HOURS, 2.5, 3],
+    "location_good": [0.75, SCORE_WEIGHTS["location_good"], 1.25],
+    "location_penalty": [-0.5, SCORE_WEIGHTS["location_penalty"], 0],
+    "no_daily_zones": [-0.75, SCORE_WEIGHTS["no_daily_zones"], -0.25],
+    "daily_cap_pct": [0.30, DAILY_CAP_PCT, 0.50],
+    "divider": sorted(DIVIDER_MAP.values()),
+}
+
+# Daily range and daily loss reset at the UTC daily candle, as on crypto charts
+SESSION_TIMEZONE = pytz.utc
+
+# Simulated prop account used to score a candidate
+STARTING_BALANCE = 100000.0
+MAX_DD_PCT = 10.0
+DAILY_DD_PCT = 5.0
+
+TZ = pytz.timezone(TIMEZONE)
+
+
+def parse_time(value, naive_tz=pytz.utc):
+    value = value.strip()
+    try:
+        stamp = float(value)
+    except ValueError:
+        moment = datetime.fromisoformat(value)
+        if moment.tzinfo is None:
+            moment = naive_tz.localize(moment)
+    else:
+        if stamp > 1e12:
+            stamp /= 1000
+        moment = datetime.fromtimestamp(stamp, pytz.utc)
+    return moment.astimezone(TZ)
+
+
+def is_yes(value):
+    return value.strip().lower() in ("1", "y", "yes", "true")
+
+
+# =============================
+# PER-SYMBOL PRECOMPUTATION
+# =============================
+@lru_cache(maxsize=None)
+def load_symbol(data_dir, symbol):
+    path = os.path.join(data_dir, f"{symbol}.csv")
+    with open(path, newline="") as f:
+        rows = sorted(
+            (parse_time(row["timestamp"]), float(row["high"]), float(row["low"]), float(row["close"]))
+            for row in csv.DictReader(f)
+        )
+
+    # Candle timestamps are open times; a bar is only known once it closes
+    gaps = [b[0] - a[0] for a, b in zip(rows, rows[1:]) if b[0] > a[0]]
+    if not gaps:
+        raise ValueError(f"{path} needs at least two candles to infer the bar interval")
+    interval = min(gaps)
+
+    close_times = []
+    locations = []
+    day = None
+
+    for moment, high, low, close in rows:
+        session_day = moment.astimezone(SESSION_TIMEZONE).date()
+        if session_day != day:
+            day = session_day
+            day_high, day_low = high, low
+        day_high = max(day_high, high)
+        day_low = min(day_low, low)
+
+        # Same three buckets the trade plan asks for in Gate 1
+        span = day_high - day_low
+        position = (close - day_low) / span if span else 0.5
+        if position <= 1 / 3:
+            location = "Near Daily Low"
+        elif position >= 2 / 3:
+            location = "Near Daily High"
+        else:
+            location = "Middle of Range"
+
+        close_times.append((moment + interval).timestamp())
+        locations.append(location)
+
+    return close_times, locations
+
+
+def minutes_to_block_close(moment):
+    _, block_end, _ = get_4h_window(moment)
+    return (block_end - moment).total_seconds() / 60
+
+
+def load_trades(journal_path, data_dir, journal_tz=TZ):
+    with open(journal_path, newline="") as f:
+        rows = list(csv.DictReader(f))
+
+    trades = []
+    skipped = []
+
+    # Line 1 is the CSV header
+    for line, row in enumerate(rows, 2):
+        try:
+            moment = parse_time(row["timestamp"], journal_tz)
+            r_multiple = float(row["r_multiple"])
+            close_times, locations = load_symbol(data_dir, row["symbol"])
+        except (OSError, ValueError, KeyError, TypeError) as exc:
+            skipped.append((line, str(exc)))
+            continue
+
+        # Last bar fully closed at entry time
+        i = bisect_right(close_times, moment.timestamp()) - 1
+        if i < 0:
+            skipped.append((line, f"no closed {row['symbol']} candle before {moment:%Y-%m-%d %H:%M}"))
+            continue
+
+        direction = row["direction"].strip().capitalize()
+        location = locations[i]
+
+        trades.append({
+            "time": moment,
+            "session_day": moment.astimezone(SESSION_TIMEZONE).date(),
+            "minutes_to_close": minutes_to_block_close(moment),
+            "location_good": (
+                (direction == "Long" and location == "Near Daily Low")
+                or (direction == "Short" and location == "Near Daily High")
+            ),
+            "location_bad": (
+                (direction == "Long" and location == "Near Daily High")
+                or (direction == "Short" and location == "Near Daily Low")
+            ),
+            "daily_zones": is_yes(row["daily_zones"]),
+            "target_ok": is_yes(row["target_ok"]),
+            "timing_ok": is_yes(row["timing_ok"]),
+            "r_multiple": r_multiple,
+        })
+
+    trades.sort(key=lambda t: t["time"])
+    return trades, skipped
+
+
+# =============================
+# CANDIDATE EVALUATION
+# =============================
+def candidates():
+    keys = list(PARAM_GRID)
+    for values in itertools.product(*(PARAM_GRID[k] for k in keys)):
+        yield dict(zip(keys, values))
+
+
+def evaluate(params, trades):
+    weights = dict(SCORE_WEIGHTS)
+    for key in ("location_good", "location_penalty", "no_daily_zones"):
+        weights[key] = params[key]
+    max_score = sum(w for w in weights.values() if w > 0)
+
+    max_dd_dollars = STARTING_BALANCE * (MAX_DD_PCT / 100)
+    daily_dd_dollars = STARTING_BALANCE * (DAILY_DD_PCT / 100)
+
+    balance = STARTING_BALANCE
+    peak = balance
+    max_drawdown = 0.0
+    taken = 0
+    wins = 0
+    breached = False
+    day = None
+    day_pnl = 0.0
+
+    for trade in trades:
+        if trade["session_day"] != day:
+            day = trade["session_day"]
+            day_pnl = 0.0
+        in_window = trade["minutes_to_close"] <= params["window_hours"] * 60
+
+        # Same hard gates as show_trade_plan — anything else is WAITING
+        if not (trade["target_ok"] and trade["timing_ok"] and in_window):
+            continue
+
+        score = (
+            weights["context"] + weights["direction"] + weights["alignment"]
+            + weights["target"] + weights["timing"]
+        )
+        if not trade["daily_zones"]:
+            score += weights["no_daily_zones"]
+        if trade["location_bad"]:
+            score += weights["location_penalty"]
+        if trade["location_good"]:
+            score += weights["location_good"]
+
+        if score / max_score * 100 < HIGH_DISCIPLINE_PCT:
+            continue
+
+        remaining_dd = max_dd_dollars - (STARTING_BALANCE - balance)
+        risk_dollars, _ = prop_firm_risk(
+            remaining_dd, daily_dd_dollars, params["divider"], params["daily_cap_pct"]
+        )
+        pnl = risk_dollars * trade["r_multiple"]
+        balance += pnl
+        day_pnl += pnl
+        taken += 1
+        wins += trade["r_multiple"] > 0
+
+        peak = max(peak, balance)
+        max_drawdown = max(max_drawdown, peak - balance)
+
+        # Either prop firm limit ends the account, as it would the challenge
+        if day_pnl <= -daily_dd_dollars or STARTING_BALANCE - balance >= max_dd_dollars:
+            breached = True
+            break
+
+    pnl = balance - STARTING_BALANCE
+    return {
+        "pnl": pnl,
+        "trades": taken,
+        "wins": wins,
+        "win_rate": wins / taken if taken else 0.0,
+        "max_drawdown": max_drawdown,
+        "breached": breached,
+        # Floor of one base risk unit keeps drawdown-free runs from dividing by zero
+        "return_over_dd": pnl / max(max_drawdown, max_dd_dollars / max(DIVIDER_MAP.values())),
+    }
+
+
+def rank(result):
+    return result["return_over_dd"], -result["max_drawdown"]
+
+
+_TRADES = None
+
+
+def _init_worker(trades):
+    global _TRADES
+    _TRADES = trades
+
+
+def _evaluate_slice(task):
+    params, start, end = task
+    return params, evaluate(params, _TRADES[start:end])
+
+
+# =============================
+# WALK-FORWARD
+# =============================
+def walk_forward(trades, train_size, test_size, workers=None):
+    grid = list(candidates())
+    folds = []
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(trades,)) as pool:
+        start = 0
+        while start + train_size + test_size <= len(trades):
+            train_end = start + train_size
+            test_end = train_end + test_size
+
+            tasks = [(params, start, train_end) for params in grid]
+            results = pool.map(_evaluate_slice, tasks, chunksize=max(1, len(tasks) // 64))
+            valid = [r for r in results if not r[1]["breached"]]
+
+            fold = {
+                "train": (trades[start]["time"], trades[train_end - 1]["time"]),
+                "test": (trades[train_end]["time"], trades[test_end - 1]["time"]),
+                "params": None,
+            }
+            if valid:
+                best_params, in_sample = max(valid, key=lambda r: rank(r[1]))
+                fold.update(
+                    params=best_params,
+                    in_sample=in_sample,
+                    out_of_sample=evaluate(best_params, trades[train_end:test_end]),
+                )
+            folds.append(fold)
+
+            start += test_size
+
+    return folds
+
+
+def print_report(folds, journal_trades, skipped, test_size):
+    if skipped:
+        print(f"Dropped {len(skipped)} journal rows:")
+        for line, reason in skipped:
+            print(f"  line {line}: {reason}")
+        print()
+
+    if not folds:
+        print(f"Not enough journal trades ({journal_trades}) for a single train/test fold.")
+        return
+
+    total_pnl = 0.0
+    total_trades = 0
+    total_wins = 0
+    breaches = 0
+
+    for n, fold in enumerate(folds, 1):
+        test_from, test_to = fold["test"]
+        print(f"Fold {n}: test {test_from:%Y-%m-%d %H:%M} → {test_to:%Y-%m-%d %H:%M}")
+
+        if fold["params"] is None:
+            print("  no candidate stayed within the drawdown limits — fold not traded")
+            continue
+
+        ins = fold["in_sample"]
+        oos = fold["out_of_sample"]
+
+        print("  params: " + ", ".join(f"{k}={v}" for k, v in fold["params"].items()))
+        print(
+            f"  in-sample:     ${ins['pnl']:,.2f} over {ins['trades']} trades, "
+            f"P&L / max DD {ins['return_over_dd']:.2f}"
+        )
+        print(
+            f"  out-of-sample: ${oos['pnl']:,.2f} over {oos['trades']} trades, "
+            f"win rate {oos['win_rate']:.0%}, max DD ${oos['max_drawdown']:,.2f}"
+            + (" — BREACHED" if oos["breached"] else "")
+        )
+
+        total_pnl += oos["pnl"]
+        total_trades += oos["trades"]
+        total_wins += oos["wins"]
+        breaches += oos["breached"]
+
+    uncovered = journal_trades - len(folds) * test_size
+    print()
+    print(f"Out-of-sample total: ${total_pnl:,.2f} over {total_trades} trades")
+    if total_trades:
+        print(f"Out-of-sample win rate: {total_wins / total_trades:.0%}")
+    print(f"Out-of-sample limit breaches: {breaches} of {len(folds)} folds")
+    print(
+        f"Journal coverage: {len(folds) * test_size} of {journal_trades} loaded trades tested "
+        f"out-of-sample ({uncovered} train-only or past the last fold), "
+        f"{len(skipped)} rows dropped"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Walk-forward optimizer for the DTT entry window, discipline weights and risk settings."
+    )
+    parser.add_argument("--data-dir", required=True, help="Directory of <SYMBOL>.csv candle files")
+    parser.add_argument("--journal", required=True, help="Journal CSV of taken trades and their R outcome")
+    parser.add_argument("--train", type=int, default=60, help="Trades per in-sample window")
+    parser.add_argument("--test", type=int, default=20, help="Trades per out-of-sample window")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument(
+        "--journal-tz", default=TIMEZONE, help=f"Timezone of naive journal timestamps (default: {TIMEZONE})"
+    )
+    args = parser.parse_args()
+
+    trades, skipped = load_trades(args.journal, args.data_dir, pytz.timezone(args.journal_tz))
+    folds = walk_forward(trades, args.train, args.test, args.workers)
+    print_report(folds, len(trades), skipped, args.test)
+
+
+if __name__ == "__main__":
+    main()
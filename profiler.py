@@ -0,0 +1,259 @@
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+
+import streamlit as st
+
+# Opt-in rerun profiling: DTT_PROFILE=1 in the environment, or ?profile=1 in the URL
+# when DTT_PROFILE_ALLOW_QUERY=1 permits it.
+# Each rerun writes <id>.folded (collapsed stacks for flamegraph.pl / speedscope)
+# and <id>.tracemalloc (load with tracemalloc.Snapshot.load) to PROFILE_DIR.
+# The stack sampler is wall-clock: it records the rerun thread every
+# SAMPLE_INTERVAL whether it is computing or waiting, so blocked time shows up too.
+# Only the last RECENT_RUNS runs are kept.
+#
+# tracemalloc is process-wide: snapshots and peak memory include every session
+# that was running at the same time, and are labelled as such.
+
+PROFILE_DIR = os.environ.get("DTT_PROFILE_DIR", ".profiles")
+INDEX_FILE = "runs.jsonl"
+SAMPLE_INTERVAL = 0.005
+RECENT_RUNS = 50
+
+_local = threading.local()
+
+# Shared tracemalloc state across concurrent reruns
+_trace_lock = threading.Lock()
+_active_runs = 0
+_owns_tracing = False
+
+# Guards runs.jsonl and the pruning of old run files
+_index_lock = threading.Lock()
+
+
+def _env_flag(name):
+    return os.environ.get(name, "").lower() in ("1", "true", "yes")
+
+
+def profiling_enabled():
+    if _env_flag("DTT_PROFILE"):
+        return True
+    if not _env_flag("DTT_PROFILE_ALLOW_QUERY"):
+        return False
+    return st.query_params.get("profile") == "1"
+
+
+def mark_gate(gate):
+    run = getattr(_local, "run", None)
+    if run is not None:
+        run["gate"] = gate
+
+
+# =============================
+# SAMPLING PROFILER
+# =============================
+class _Sampler(threading.Thread):
+    def __init__(self, target_ident, line_detail=False):
+        super().__init__(daemon=True)
+        self.target_ident = target_ident
+        self.line_detail = line_detail
+        self.stacks = Counter()
+        self.done = threading.Event()
+
+    def run(self):
+        # Stacks stay as code objects here; labels are built once in folded_lines()
+        while not self.done.wait(SAMPLE_INTERVAL):
+            frame = sys._current_frames().get(self.target_ident)
+            stack = []
+            while frame is not None:
+                stack.append((frame.f_code, frame.f_lineno) if self.line_detail else frame.f_code)
+                frame = frame.f_back
+            if stack:
+                self.stacks[tuple(reversed(stack))] += 1
+
+    def stop(self):
+        self.done.set()
+        self.join()
+
+    def folded_lines(self):
+        labels = {}
+
+        def label(entry):
+            if entry not in labels:
+                if self.line_detail:
+                    code, lineno = entry
+                    labels[entry] = f"{code.co_name} ({os.path.basename(code.co_filename)}:{lineno})"
+                else:
+                    labels[entry] = f"{entry.co_name} ({os.path.basename(entry.co_filename)})"
+            return labels[entry]
+
+        folded = Counter()
+        for stack, count in self.stacks.items():
+            folded[";".join(label(entry) for entry in stack)] += count
+        return [f"{stack} {count}\n" for stack, count in folded.items()]
+
+
+# =============================
+# SHARED TRACEMALLOC
+# =============================
+def _acquire_tracing():
+    global _active_runs, _owns_tracing
+    with _trace_lock:
+        if _active_runs == 0:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                _owns_tracing = True
+            tracemalloc.reset_peak()
+        _active_runs += 1
+
+
+def _release_tracing():
+    global _active_runs, _owns_tracing
+    with _trace_lock:
+        _active_runs -= 1
+        if _active_runs == 0 and _owns_tracing:
+            tracemalloc.stop()
+            _owns_tracing = False
+
+
+# =============================
+# RUN RECORDING
+# =============================
+def _read_index(path):
+    # Truncated or corrupt lines are skipped rather than breaking the app
+    records = []
+    if not os.path.exists(path):
+        return records
+    with open(path) as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(record, dict) and "run_id" in record:
+                records.append(record)
+    return records
+
+
+def _write_run(run_id, record, sampler, snapshot):
+    with open(os.path.join(PROFILE_DIR, f"{run_id}.folded"), "w") as f:
+        f.writelines(sampler.folded_lines())
+    snapshot.dump(os.path.join(PROFILE_DIR, f"{run_id}.tracemalloc"))
+
+    with _index_lock:
+        path = os.path.join(PROFILE_DIR, INDEX_FILE)
+        records = _read_index(path) + [record]
+
+        for old in records[:-RECENT_RUNS]:
+            for ext in (".folded", ".tracemalloc"):
+                try:
+                    os.remove(os.path.join(PROFILE_DIR, old["run_id"] + ext))
+                except FileNotFoundError:
+                    pass
+
+        # Replace atomically so a crash mid-write never leaves a partial index
+        tmp_path = f"{path}.{uuid.uuid4().hex[:6]}.tmp"
+        with open(tmp_path, "w") as f:
+            f.writelines(json.dumps(r) + "\n" for r in records[-RECENT_RUNS:])
+        os.replace(tmp_path, path)
+
+
+@contextmanager
+def profile_run(page):
+    if not profiling_enabled():
+        yield
+        return
+
+    run_id = f"{datetime.now():%Y%m%d-%H%M%S}-{uuid.uuid4().hex[:6]}"
+    acquired = False
+
+    try:
+        _acquire_tracing()
+        acquired = True
+        sampler = _Sampler(threading.get_ident(), line_detail=_env_flag("DTT_PROFILE_LINES"))
+        sampler.start()
+    except Exception as exc:
+        # Run the page unprofiled rather than leave tracing switched on
+        print(f"Profiling failed for {run_id}: {exc}", file=sys.stderr)
+        if acquired:
+            _release_tracing()
+        yield
+        return
+
+    _local.run = {"gate": "Start"}
+    start = time.perf_counter()
+
+    try:
+        yield
+    finally:
+        duration = time.perf_counter() - start
+        gate = _local.run["gate"]
+        _local.run = None
+
+        # Profiling problems are reported on the console and never replace
+        # the page's own result or Streamlit's stop / rerun exceptions
+        try:
+            sampler.stop()
+            snapshot = tracemalloc.take_snapshot().filter_traces([
+                tracemalloc.Filter(False, __file__),
+            ])
+            _, peak = tracemalloc.get_traced_memory()
+        except Exception as exc:
+            print(f"Profiling failed for {run_id}: {exc}", file=sys.stderr)
+        else:
+            record = {
+                "run_id": run_id,
+                "page": page,
+                "gate": gate,
+                "duration_ms": round(duration * 1000, 1),
+                "process_peak_kb": round(peak / 1024, 1),
+                "samples": sum(sampler.stacks.values()),
+            }
+            try:
+                os.makedirs(PROFILE_DIR, exist_ok=True)
+                _write_run(run_id, record, sampler, snapshot)
+            except Exception as exc:
+                print(f"Profiling failed for {run_id}: {exc}", file=sys.stderr)
+        finally:
+            _release_tracing()
+
+
+# =============================
+# SIDEBAR VIEWER
+# =============================
+def recent_runs():
+    with _index_lock:
+        return _read_index(os.path.join(PROFILE_DIR, INDEX_FILE))
+
+
+def show_profile_viewer():
+    with st.sidebar:
+        st.divider()
+        st.header("Profiling")
+
+        runs = sorted(recent_runs(), key=lambda r: r.get("duration_ms", 0), reverse=True)
+        if not runs:
+            st.caption("No profiled reruns yet.")
+            return
+
+        st.caption(
+            f"Slowest of the last {len(runs)} reruns — files in `{PROFILE_DIR}/`. "
+            "Stack samples are wall-clock; peak memory is process-wide."
+        )
+        st.table([
+            {
+                "Page": r.get("page"),
+                "Stopped at": r.get("gate"),
+                "ms": r.get("duration_ms"),
+                "Process peak KB": r.get("process_peak_kb"),
+                "Run": r.get("run_id"),
+            }
+            for r in runs[:10]
+        ])
@@ -1,4 +1,28 @@
 import streamlit as st
+from profiler import mark_gate
+
+# Risk mode settings — dividers split remaining drawdown, percentages size personal risk
+DIVIDER_MAP = {
+    "Aggressive": 10,
+    "Balanced": 20,
+    "Sustainable": 40
+}
+RISK_PCT_MAP = {
+    "Aggressive": 5,
+    "Balanced": 2,
+    "Sustainable": 1
+}
+DAILY_CAP_PCT = 0.40
+
+
+def prop_firm_risk(remaining_dd, daily_dd_dollars, divider, daily_cap_pct=DAILY_CAP_PCT):
+    base_risk = remaining_dd / divider
+    daily_cap = daily_dd_dollars * daily_cap_pct
+
+    if base_risk > daily_cap:
+        return daily_cap, True
+    return base_risk, False
+
 
 def show_risk_calculator():
     st.title("🛡️ Crypto Perpetual Trading Risk Guard")
@@ -60,28 +84,19 @@ def show_risk_calculator():
             )
 
     # ---------- RISK MODE SETTINGS ----------
-    divider_map = {
-        "Aggressive": 10,
-        "Balanced": 20,
-        "Sustainable": 40
-    }
-    divider = divider_map[risk_mode]
+    divider = DIVIDER_MAP[risk_mode]
 
     # ---------- PERSONAL ACCOUNT ----------
     if account_type == "Personal Account":
-        risk_pct_map = {
-            "Aggressive": 5,
-            "Balanced": 2,
-            "Sustainable": 1
-        }
-
-        risk_pct = risk_pct_map[risk_mode]
+        mark_gate("Personal Account")
+        risk_pct = RISK_PCT_MAP[risk_mode]
         risk_dollars = current_balance * (risk_pct / 100)
 
         note = "✅ Personal account risk applied based on selected risk mode."
 
     # ---------- PROP FIRM ----------
     else:
+        mark_gate("Prop Firm")
         max_dd_dollars = starting_balance * (max_dd_pct / 100)
         daily_dd_dollars = starting_balance * (daily_dd_pct / 100)
 
@@ -90,16 +105,14 @@ def show_risk_calculator():
 
         if remaining_dd <= 0:
             st.error("❌ Account has breached max drawdown.")
+            mark_gate("Prop Firm: Drawdown Breached")
             st.stop()
 
-        base_risk = remaining_dd / divider
-        daily_cap = daily_dd_dollars * 0.40
+        risk_dollars, capped = prop_firm_risk(remaining_dd, daily_dd_dollars, divider)
 
-        if base_risk > daily_cap:
-            risk_dollars = daily_cap
+        if capped:
             note = "⚠️ Risk capped to protect daily drawdown"
         else:
-            risk_dollars = base_risk
             note = "✅ Risk within prop firm limits"
 
     # ---------- LEVERAGE CALC ----------
@@ -109,6 +122,7 @@ def show_risk_calculator():
     leverage = position_size / margin_used
 
     # ---------- OUTPUT ----------
+    mark_gate("Risk Output")
     st.subheader("Risk Output")
 
     col1, col2 = st.columns(2)
@@ -0,0 +1,180 @@
+from datetime import date, datetime
+
+import pytest
+
+pytest.importorskip("streamlit")
+pytz = pytest.importorskip("pytz")
+
+from optimizer import PARAM_GRID, evaluate, load_symbol, load_trades
+from risk_calculator import DAILY_CAP_PCT, DIVIDER_MAP, prop_firm_risk
+from trade_plan_dtt import ENTRY_WINDOW_HOURS, MAX_SCORE, SCORE_WEIGHTS, TIMEZONE, get_4h_window
+
+TZ = pytz.timezone(TIMEZONE)
+
+DEFAULT_PARAMS = {
+    "window_hours": ENTRY_WINDOW_HOURS,
+    "location_good": SCORE_WEIGHTS["location_good"],
+    "location_penalty": SCORE_WEIGHTS["location_penalty"],
+    "no_daily_zones": SCORE_WEIGHTS["no_daily_zones"],
+    "daily_cap_pct": DAILY_CAP_PCT,
+    "divider": DIVIDER_MAP["Balanced"],
+}
+
+
+def make_trade(**overrides):
+    trade = {
+        "time": TZ.localize(datetime(2025, 1, 2, 13, 30)),
+        "session_day": date(2025, 1, 2),
+        "minutes_to_close": 90,
+        "location_good": True,
+        "location_bad": False,
+        "daily_zones": True,
+        "target_ok": True,
+        "timing_ok": True,
+        "r_multiple": 2.0,
+    }
+    trade.update(overrides)
+    return trade
+
+
+def test_default_max_score():
+    assert MAX_SCORE == 5.75
+
+
+def test_default_params_are_in_grid():
+    for key, value in DEFAULT_PARAMS.items():
+        assert value in PARAM_GRID[key]
+
+
+def test_4h_window_wraps_to_previous_day():
+    now = TZ.localize(datetime(2025, 1, 2, 1, 30))
+    block_start, block_end, entry_start = get_4h_window(now)
+
+    assert block_start == TZ.localize(datetime(2025, 1, 1, 23, 0))
+    assert block_end == TZ.localize(datetime(2025, 1, 2, 3, 0))
+    assert entry_start == TZ.localize(datetime(2025, 1, 2, 1, 0))
+
+
+def test_4h_window_mid_day():
+    now = TZ.localize(datetime(2025, 1, 2, 12, 15))
+    block_start, block_end, entry_start = get_4h_window(now)
+
+    assert (block_start.hour, block_end.hour, entry_start.hour) == (11, 15, 13)
+
+
+def test_prop_firm_risk():
+    assert prop_firm_risk(10000, 5000, 20) == (500, False)
+    assert prop_firm_risk(10000, 1000, 10) == (400, True)
+
+
+def test_evaluate_takes_trade_passing_all_gates():
+    result = evaluate(DEFAULT_PARAMS, [make_trade()])
+
+    assert result["trades"] == 1
+    assert result["wins"] == 1
+    assert result["pnl"] == pytest.approx(1000)
+
+
+@pytest.mark.parametrize("overrides", [
+    {"timing_ok": False},
+    {"target_ok": False},
+    {"minutes_to_close": 150},
+])
+def test_evaluate_respects_hard_gates(overrides):
+    result = evaluate(DEFAULT_PARAMS, [make_trade(**overrides)])
+
+    assert result["trades"] == 0
+    assert result["pnl"] == 0
+
+
+def test_evaluate_breaches_daily_loss_limit():
+    # Slipped -3R losers: $3,000 then $2,100 crosses the $5,000 daily limit
+    params = dict(DEFAULT_PARAMS, divider=DIVIDER_MAP["Aggressive"])
+    trades = [make_trade(r_multiple=-3.0) for _ in range(3)]
+
+    result = evaluate(params, trades)
+
+    assert result["breached"]
+    assert result["trades"] == 2
+
+
+def test_evaluate_daily_loss_resets_each_session():
+    params = dict(DEFAULT_PARAMS, divider=DIVIDER_MAP["Aggressive"])
+    trades = [
+        make_trade(r_multiple=-3.0, session_day=date(2025, 1, 2)),
+        make_trade(r_multiple=-3.0, session_day=date(2025, 1, 3)),
+    ]
+
+    assert not evaluate(params, trades)["breached"]
+
+
+def write_candles(path):
+    path.write_text(
+        "timestamp,open,high,low,close,volume\n"
+        "2025-01-02T00:00:00+00:00,100,110,100,101,1\n"
+        "2025-01-02T01:00:00+00:00,101,120,100,119,1\n"
+    )
+
+
+def test_load_trades_reports_bad_rows(tmp_path):
+    write_candles(tmp_path / "BTC.csv")
+    journal = tmp_path / "journal.csv"
+    journal.write_text(
+        "timestamp,symbol,direction,daily_zones,target_ok,timing_ok,r_multiple\n"
+        "2025-01-02T01:30:00+00:00,BTC,Long,yes,yes,yes,2\n"
+        "2025-01-02T01:30:00+00:00,ETH,Long,yes,yes,yes,2\n"
+        "2025-01-01T12:00:00+00:00,BTC,Long,yes,yes,yes,2\n"
+        "2025-01-02T01:30:00+00:00,BTC,Long,yes,yes,yes,\n"
+    )
+
+    trades, skipped = load_trades(str(journal), str(tmp_path))
+
+    assert len(trades) == 1
+    assert [line for line, _ in skipped] == [3, 4, 5]
+
+
+def test_load_symbol_needs_two_bars(tmp_path):
+    (tmp_path / "BTC.csv").write_text(
+        "timestamp,open,high,low,close,volume\n"
+        "2025-01-02T00:00:00+00:00,100,110,100,101,1\n"
+    )
+
+    with pytest.raises(ValueError):
+        load_symbol(str(tmp_path), "BTC")
+
+
+def test_naive_journal_times_use_journal_tz(tmp_path):
+    write_candles(tmp_path / "BTC.csv")
+    journal = tmp_path / "journal.csv"
+    journal.write_text(
+        "timestamp,symbol,direction,daily_zones,target_ok,timing_ok,r_multiple\n"
+        "2025-01-01T20:30:00,BTC,Long,yes,yes,yes,2\n"
+    )
+
+    (trade,), _ = load_trades(str(journal), str(tmp_path), TZ)
+
+    assert trade["time"] == pytz.utc.localize(datetime(2025, 1, 2, 1, 30))
+    assert trade["session_day"] == date(2025, 1, 2)
+
+
+def test_load_trades_uses_closed_bars_and_utc_sessions(tmp_path):
+    (tmp_path / "BTC.csv").write_text(
+        "timestamp,open,high,low,close,volume\n"
+        # Previous UTC day, same Bogota calendar day — must not widen the range
+        "2025-01-01T23:00:00+00:00,100,200,50,100,1\n"
+        "2025-01-02T00:00:00+00:00,100,110,100,101,1\n"
+        # Still open at entry — must not be seen
+        "2025-01-02T01:00:00+00:00,101,120,100,119,1\n"
+    )
+    journal = tmp_path / "journal.csv"
+    journal.write_text(
+        "timestamp,symbol,direction,daily_zones,target_ok,timing_ok,r_multiple\n"
+        "2025-01-02T01:30:00+00:00,BTC,Long,yes,yes,yes,2\n"
+    )
+
+    (trade,), skipped = load_trades(str(journal), str(tmp_path))
+
+    assert not skipped
+
+    assert trade["location_good"]
+    assert not trade["location_bad"]
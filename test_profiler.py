@@ -0,0 +1,103 @@
+import os
+import threading
+import time
+import tracemalloc
+
+import pytest
+
+pytest.importorskip("streamlit")
+
+import profiler
+
+
+@pytest.fixture
+def profile_dir(tmp_path, monkeypatch):
+    monkeypatch.setenv("DTT_PROFILE", "1")
+    monkeypatch.setattr(profiler, "PROFILE_DIR", str(tmp_path))
+    return tmp_path
+
+
+def profiled(gate, delay):
+    with profiler.profile_run("DTT Trade Plan"):
+        profiler.mark_gate(gate)
+        time.sleep(delay)
+
+
+def test_query_param_needs_env_permission(monkeypatch):
+    monkeypatch.delenv("DTT_PROFILE", raising=False)
+    monkeypatch.delenv("DTT_PROFILE_ALLOW_QUERY", raising=False)
+    monkeypatch.setattr(profiler.st, "query_params", {"profile": "1"}, raising=False)
+
+    assert not profiler.profiling_enabled()
+
+    monkeypatch.setenv("DTT_PROFILE_ALLOW_QUERY", "1")
+    assert profiler.profiling_enabled()
+
+
+def test_overlapping_runs_are_all_recorded(profile_dir):
+    was_tracing = tracemalloc.is_tracing()
+    threads = [
+        threading.Thread(target=profiled, args=(f"Gate {n}", delay))
+        for n, delay in enumerate((0.2, 0.02, 0.1))
+    ]
+    for thread in threads:
+        thread.start()
+        time.sleep(0.01)
+    for thread in threads:
+        thread.join()
+
+    assert sorted(r["gate"] for r in profiler.recent_runs()) == ["Gate 0", "Gate 1", "Gate 2"]
+    assert tracemalloc.is_tracing() == was_tracing
+
+
+def test_old_runs_are_pruned(profile_dir, monkeypatch):
+    monkeypatch.setattr(profiler, "RECENT_RUNS", 2)
+
+    for _ in range(4):
+        profiled("Gate 2: Target", 0)
+
+    run_ids = {r["run_id"] for r in profiler.recent_runs()}
+    files = {name.rsplit(".", 1)[0] for name in os.listdir(profile_dir) if name != profiler.INDEX_FILE}
+
+    assert len(run_ids) == 2
+    assert files == run_ids
+
+
+def test_page_exception_is_not_replaced(profile_dir, monkeypatch):
+    def broken(*args, **kwargs):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(profiler, "_write_run", broken)
+
+    with pytest.raises(KeyError):
+        with profiler.profile_run("Risk Calculator"):
+            raise KeyError("page")
+
+
+def test_corrupt_index_lines_are_skipped(profile_dir):
+    profiled("Gate 1: Direction & Context", 0)
+    with open(profile_dir / profiler.INDEX_FILE, "a") as f:
+        f.write('{"run_id": "truncat')
+
+    profiled("Gate 2: Target", 0)
+
+    assert [r["gate"] for r in profiler.recent_runs()] == [
+        "Gate 1: Direction & Context",
+        "Gate 2: Target",
+    ]
+
+
+def test_failed_setup_releases_tracing(profile_dir, monkeypatch):
+    was_tracing = tracemalloc.is_tracing()
+
+    def broken(self):
+        raise RuntimeError("can't start new thread")
+
+    monkeypatch.setattr(profiler._Sampler, "start", broken)
+
+    with profiler.profile_run("DTT Trade Plan"):
+        profiler.mark_gate("Gate 2: Target")
+
+    assert profiler._active_runs == 0
+    assert tracemalloc.is_tracing() == was_tracing
+    assert getattr(profiler._local, "run", None) is None
@@ -1,6 +1,52 @@
 import streamlit as st
 from datetime import datetime, timedelta
 import pytz
+from profiler import mark_gate
+
+# Discipline weights — MAX_SCORE is the sum of every positive award
+SCORE_WEIGHTS = {
+    "context": 0.5,
+    "no_daily_zones": -0.5,
+    "direction": 1,
+    "location_penalty": -0.25,
+    "location_good": 1,
+    "alignment": 1.25,
+    "target": 1,
+    "timing": 1,
+}
+MAX_SCORE = sum(w for w in SCORE_WEIGHTS.values() if w > 0)
+HIGH_DISCIPLINE_PCT = 75
+
+# Fixed 4H blocks (UTC-5) and the entry window at the end of each block
+TIMEZONE = "America/Bogota"
+BLOCKS = [
+    (23, 3),
+    (3, 7),
+    (7, 11),
+    (11, 15),
+    (15, 19),
+    (19, 23)
+]
+ENTRY_WINDOW_HOURS = 2
+
+
+def get_4h_window(now, window_hours=ENTRY_WINDOW_HOURS):
+    for start, end in BLOCKS:
+        if start > end:
+            if now.hour >= start or now.hour < end:
+                block_start = now.replace(hour=start, minute=0, second=0, microsecond=0)
+                if now.hour < end:
+                    block_start -= timedelta(days=1)
+                block_end = block_start + timedelta(hours=4)
+                break
+        else:
+            if start <= now.hour < end:
+                block_start = now.replace(hour=start, minute=0, second=0, microsecond=0)
+                block_end = block_start + timedelta(hours=4)
+                break
+
+    entry_window_start = block_end - timedelta(hours=window_hours)
+    return block_start, block_end, entry_window_start
 
 
 def show_trade_plan():
@@ -9,13 +55,14 @@ def show_trade_plan():
     st.divider()
 
     discipline_score = 0
-    max_score = 5.75
+    max_score = MAX_SCORE
     trade_state = "WAITING"  # <-- FIX: default state to prevent crash
     
     # =============================
     # GATE 0 — DIRECTION & CONTEXT
     # =============================
 
+    mark_gate("Gate 0: Chart Preparation")
     st.subheader("📆 Chart Analysis Preparation")
 
     # ---------- WEEKLY ----------
@@ -102,9 +149,9 @@ def show_trade_plan():
     else:
         if daily_zones.startswith("No"):
             st.caption("ℹ️ No valid daily zones — H4 may be used if required.")
-            discipline_score += -0.5
+            discipline_score += SCORE_WEIGHTS["no_daily_zones"]
 
-    discipline_score += 0.5
+    discipline_score += SCORE_WEIGHTS["context"]
     # ----- Gate 1 Pass Condition -----
     
 
@@ -114,6 +161,7 @@ def show_trade_plan():
    # =============================
     # GATE 1 — DIRECTION & CONTEXT
     # =============================
+    mark_gate("Gate 1: Direction & Context")
     st.subheader("🟦 Gate 1: Direction & Context")
 
     trade_direction = st.radio(
@@ -162,16 +210,16 @@ def show_trade_plan():
         show_footer(trade_state, 0)
         return
 
-    discipline_score += 1
+    discipline_score += SCORE_WEIGHTS["direction"]
 
     # Non-blocking location warnings (impact discipline later)
     if trade_direction == "Long" and daily_location == "Near Daily High":
         st.warning("⚠️ Longing near the daily high increases pullback risk")
-        discipline_score += -0.25
+        discipline_score += SCORE_WEIGHTS["location_penalty"]
 
     if trade_direction == "Short" and daily_location == "Near Daily Low":
         st.warning("⚠️ Shorting near the daily low risks selling the bottom")
-        discipline_score += -0.25
+        discipline_score += SCORE_WEIGHTS["location_penalty"]
 
     if daily_location == "Middle of Range":
         st.info("ℹ️ Mid-range entries require conservative stop placement")
@@ -185,7 +233,7 @@ def show_trade_plan():
         location_good = True
 
     if location_good:
-        discipline_score += 1
+        discipline_score += SCORE_WEIGHTS["location_good"]
 
     st.success("✅ Direction & context aligned")
     st.divider()
@@ -200,6 +248,7 @@ def show_trade_plan():
     # =============================
     # GATE 1.5 — ALIGNMENT (4H → 1H)
     # =============================
+    mark_gate("Gate 1.5: Alignment (4H)")
     st.subheader("🟦 Gate 1.5: Alignment")
 
     st.caption(
@@ -233,6 +282,7 @@ def show_trade_plan():
             return
 
         # ---------- 1H STRUCTURE (ONLY UNLOCKS AFTER 4H) ----------
+        mark_gate("Gate 1.5: Alignment (1H)")
         st.markdown("#### 1H Alignment")
 
         h1_structure = st.radio(
@@ -282,6 +332,7 @@ def show_trade_plan():
             show_footer(trade_state, discipline_score)
             return
 
+        mark_gate("Gate 1.5: Alignment (1H)")
         st.markdown("#### 1H Alignment")
 
         h1_structure = st.radio(
@@ -308,7 +359,7 @@ def show_trade_plan():
             return
 
     # ---------- ALIGNMENT PASSED ----------
-    discipline_score += 1.25
+    discipline_score += SCORE_WEIGHTS["alignment"]
     st.success("✅ 4H → 1H alignment confirmed")
     st.divider()
 
@@ -317,6 +368,7 @@ def show_trade_plan():
     # =============================
     # GATE 2 — TARGET
     # =============================
+    mark_gate("Gate 2: Target")
     st.subheader("🟦 Gate 2: Target")
 
     space_check = st.radio(
@@ -353,7 +405,7 @@ def show_trade_plan():
         show_footer(trade_state, discipline_score)
         return
 
-    discipline_score += 1
+    discipline_score += SCORE_WEIGHTS["target"]
     st.success("✅ Target validated")
     st.divider()
 
@@ -361,6 +413,7 @@ def show_trade_plan():
     # =============================
     # GATE 3 — TIMING & ENTRY
     # =============================
+    mark_gate("Gate 3: Timing & Entry")
     st.subheader("🟦 Gate 3: Timing & Entry")
 
     entry_tf = st.radio(
@@ -397,33 +450,10 @@ def show_trade_plan():
     # =============================
     # FIXED 4H WINDOWS (UTC-5)
     # =============================
-    tz = pytz.timezone("America/Bogota")
+    tz = pytz.timezone(TIMEZONE)
     now = datetime.now(tz)
 
-    blocks = [
-        (23, 3),
-        (3, 7),
-        (7, 11),
-        (11, 15),
-        (15, 19),
-        (19, 23)
-    ]
-
-    for start, end in blocks:
-        if start > end:
-            if now.hour >= start or now.hour < end:
-                block_start = now.replace(hour=start, minute=0, second=0, microsecond=0)
-                if now.hour < end:
-                    block_start -= timedelta(days=1)
-                block_end = block_start + timedelta(hours=4)
-                break
-        else:
-            if start <= now.hour < end:
-                block_start = now.replace(hour=start, minute=0, second=0, microsecond=0)
-                block_end = block_start + timedelta(hours=4)
-                break
-
-    entry_window_start = block_end - timedelta(hours=2)
+    block_start, block_end, entry_window_start = get_4h_window(now)
     in_window = entry_window_start <= now <= block_end
 
     st.markdown("### ⏱️ Time Context")
@@ -438,7 +468,7 @@ def show_trade_plan():
         minutes_to_window = int((entry_window_start - now).total_seconds() // 60)
         if minutes_to_window < 0:
             next_block_start = block_start + timedelta(hours=4)
-            next_entry = next_block_start + timedelta(hours=2)
+            next_entry = next_block_start + timedelta(hours=4 - ENTRY_WINDOW_HOURS)
             minutes_to_window = int((next_entry - now).total_seconds() // 60)
 
         st.warning(
@@ -449,11 +479,11 @@ def show_trade_plan():
     else:
         st.success("🟢 Inside optimal execution window")
         if timing_ok:
-            discipline_score += 1
+            discipline_score += SCORE_WEIGHTS["timing"]
             trade_state = "TRADE READY"
 
     st.caption(
-        "📊 Volume tends to increase during the final 2 hours of every 4H candle. "
+        f"📊 Volume tends to increase during the final {ENTRY_WINDOW_HOURS} hours of every 4H candle. "
         "This window statistically improves continuation and execution quality."
     )
 
@@ -461,6 +491,7 @@ def show_trade_plan():
     # FINAL DECISION
     # =============================
     if timing_ok and in_window:
+        mark_gate("Trade Ready")
         st.success("🟢 TRADE CONDITIONS MET")
 
         st.markdown("### 📌 Stop-Loss Guidance")
@@ -500,12 +531,12 @@ def show_footer(trade_state, discipline_score, trade_direction=None, daily_bias=
 
     st.divider()
 
-    score_pct = int((discipline_score / 5.75) * 100)
+    score_pct = int((discipline_score / MAX_SCORE) * 100)
 
     st.markdown("### 📊 Trade Plan Discipline")
     st.progress(score_pct)
 
-    if score_pct >= 75:
+    if score_pct >= HIGH_DISCIPLINE_PCT:
         st.success(f"High discipline ({score_pct}%)")
     elif score_pct >= 50:
         st.warning(f"Moderate discipline ({score_pct}%)")